@@ -1,10 +1,29 @@
+import argparse
 import csv
+import io
+import multiprocessing
+import os
+import queue
+import threading
 import time
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # only needed for --arrow
+    pacsv = None
+
 INPUT_FILE = "data.csv"
 ROWS_PER_FILE = 1_000_000
 TOTAL_ROWS = 6_185_391  # known total, for progress %
 OUTPUT_PREFIX = "data_clean_part"
+NUM_SHARDS = -(-TOTAL_ROWS // ROWS_PER_FILE)  # one output file per shard
+ARROW_BLOCK_SIZE = 64 << 20  # bytes of input parsed per Arrow batch
+IO_BUFFER_SIZE = 4 << 20  # file buffer for the csv-module path
+PREFETCH_BLOCK_SIZE = 1 << 20  # size of each read-ahead block
+PREFETCH_DEPTH = 32  # read-ahead blocks kept in flight
+PROGRESS_INTERVAL = 2  # seconds between progress lines on the csv-module path
 
 COLUMNS = [
     (0, "video_url"),
@@ -25,51 +44,343 @@ COLUMNS = [
 ]
 
 max_col_index = max(idx for idx, _ in COLUMNS)
+# COLUMNS keeps source columns 0..max_col_index in order, so a row can be
+# cleaned with one slice instead of picking each index
+assert [idx for idx, _ in COLUMNS] == list(range(max_col_index + 1))
+row_width = max_col_index + 1
 
 start_time = time.time()
-file_index = 1
-row_in_file = 0
-processed = 0
+
+
+class PrefetchReader(io.RawIOBase):
+    """Raw binary reader that keeps blocks of a file read ahead in a thread.
+
+    os.read() releases the GIL, so up to PREFETCH_DEPTH blocks are read
+    from disk while the main thread is busy parsing earlier ones. If
+    `counter` is given, `counter[slot]` accumulates the bytes read so far.
+    """
+
+    def __init__(self, path, offset=0, block_size=PREFETCH_BLOCK_SIZE, depth=PREFETCH_DEPTH,
+                 counter=None, slot=0):
+        super().__init__()
+        self._counter = counter
+        self._slot = slot
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        # the whole file is read front to back; let the kernel read ahead further
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        self._blocks = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._current = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, args=(block_size,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, block_size):
+        try:
+            while not self._stop.is_set():
+                block = os.read(self._fd, block_size)
+                if self._counter is not None:
+                    self._counter[self._slot] += len(block)
+                self._blocks.put(block)
+                if not block:
+                    break
+        except OSError as e:
+            self._blocks.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._current:
+            if self._eof:
+                return 0
+            block = self._blocks.get()
+            if isinstance(block, OSError):
+                raise block
+            if not block:
+                self._eof = True
+                return 0
+            self._current = memoryview(block)
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            # unblock the reader thread if it is waiting on a full queue
+            self._stop.set()
+            while self._thread.is_alive():
+                try:
+                    self._blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            os.close(self._fd)
+        super().close()
+
+
+def print_progress(processed):
+    percent = (processed / TOTAL_ROWS) * 100
+    elapsed = time.time() - start_time
+    speed = int(processed / elapsed)
+    print(
+        f"Processed {processed:,} / {TOTAL_ROWS:,} "
+        f"({percent:.2f}%) | {speed:,} rows/sec",
+        flush=True
+    )
+
 
 def open_new_file(index):
-    f = open(f"{OUTPUT_PREFIX}_{index}.csv", "w", newline="", encoding="utf-8")
+    f = open(
+        f"{OUTPUT_PREFIX}_{index}.csv", "w", newline="", encoding="utf-8",
+        buffering=IO_BUFFER_SIZE
+    )
     w = csv.writer(f, delimiter=";")
     w.writerow([name for _, name in COLUMNS])
     return f, w
 
-with open(INPUT_FILE, "r", encoding="utf-8", errors="ignore") as fin:
-    reader = csv.reader(fin, delimiter=";")
 
-    fout, writer = open_new_file(file_index)
+def clean_with_arrow():
+    """Stream INPUT_FILE through Arrow's CSV reader, trimming whole columns at once.
 
-    for row in reader:
-        processed += 1
+    Arrow rejects rows whose column count differs from row_width. Rejected
+    rows with at least `row_width` columns are cleaned with the csv module and
+    written after the batch they came from, so the output holds the same rows
+    as clean_with_csv(), though not always in the same order.
+    """
+    names = [name for _, name in COLUMNS]
+    source_columns = [f"f{idx}" for idx, _ in COLUMNS]
+    wide_rows = []
+    short_rows = []
 
+    def handle_invalid_row(row):
+        if row.actual_columns >= row_width:
+            wide_rows.append(row.text)
+        else:
+            short_rows.append(row.number)
+        return "skip"
+
+    reader = pacsv.open_csv(
+        INPUT_FILE,
+        # name the columns up front so every row, the first included, is
+        # checked against row_width instead of the first row's width
+        read_options=pacsv.ReadOptions(
+            block_size=ARROW_BLOCK_SIZE,
+            column_names=source_columns,
+        ),
+        parse_options=pacsv.ParseOptions(
+            delimiter=";",
+            newlines_in_values=True,
+            invalid_row_handler=handle_invalid_row,
+        ),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=source_columns,
+            column_types={name: pa.string() for name in source_columns},
+            check_utf8=False,
+        ),
+    )
+    schema = pa.schema([(name, pa.string()) for name in names])
+    write_options = pacsv.WriteOptions(delimiter=";")
+
+    def open_writer(index):
+        return pacsv.CSVWriter(
+            f"{OUTPUT_PREFIX}_{index}.csv", schema, write_options=write_options
+        )
+
+    def take_wide_rows():
+        # the handler may still be appending from Arrow's parsing threads
+        count = len(wide_rows)
+        texts = wide_rows[:count]
+        del wide_rows[:count]
+        rows = [row[:row_width] for row in csv.reader(texts, delimiter=";")]
+        columns = zip(*rows) if rows else [()] * row_width
+        return pa.RecordBatch.from_arrays(
+            [pa.array([field.replace("\0", "").strip() for field in col], pa.string())
+             for col in columns],
+            schema=schema,
+        )
+
+    file_index = 1
+    row_in_file = 0
+    processed = 0
+    writer = open_writer(file_index)
+
+    def write(batch):
+        nonlocal file_index, row_in_file, writer
         # rotate file every 1M rows
-        if row_in_file >= ROWS_PER_FILE:
-            fout.close()
-            file_index += 1
-            row_in_file = 0
-            fout, writer = open_new_file(file_index)
-
-        if len(row) >= max_col_index + 1:
-            cleaned = [row[idx].strip() for idx, _ in COLUMNS]
-            writer.writerow(cleaned)
-            row_in_file += 1
-
-        # progress every 100k rows
-        if processed % 100_000 == 0:
-            percent = (processed / TOTAL_ROWS) * 100
-            elapsed = time.time() - start_time
-            speed = int(processed / elapsed)
-            print(
-                f"Processed {processed:,} / {TOTAL_ROWS:,} "
-                f"({percent:.2f}%) | {speed:,} rows/sec",
-                flush=True
-            )
-
-    fout.close()
-
-elapsed = time.time() - start_time
-print(f"\nDone. {processed:,} rows processed in {elapsed:.1f} seconds.")
-print(f"Created {file_index} output files.")
+        offset = 0
+        while offset < batch.num_rows:
+            if row_in_file >= ROWS_PER_FILE:
+                writer.close()
+                file_index += 1
+                row_in_file = 0
+                writer = open_writer(file_index)
+            take = min(ROWS_PER_FILE - row_in_file, batch.num_rows - offset)
+            writer.write_batch(batch.slice(offset, take))
+            row_in_file += take
+            offset += take
+
+    for batch in reader:
+        # drop NULs, which COPY rejects, before trimming
+        batch = pa.RecordBatch.from_arrays(
+            [pc.utf8_trim_whitespace(pc.replace_substring(col, "\0", ""))
+             for col in batch.columns],
+            schema=schema,
+        )
+        wide = take_wide_rows()
+        write(batch)
+        write(wide)
+        processed += batch.num_rows + wide.num_rows
+        print_progress(processed + len(short_rows))
+
+    wide = take_wide_rows()
+    write(wide)
+    processed += wide.num_rows + len(short_rows)
+
+    writer.close()
+    return processed, len(short_rows), file_index
+
+
+def shard_ranges(size, shards):
+    """Split [0, size) into `shards` contiguous byte ranges"""
+    step = -(-size // shards)
+    return [(i * step, min((i + 1) * step, size)) for i in range(shards)]
+
+
+# Bytes read per shard, shared with the parent's progress reporter
+_shard_progress = None
+
+
+def init_shard_worker(progress):
+    global _shard_progress
+    _shard_progress = progress
+
+
+def clean_shard(job):
+    """Clean the records starting inside one byte range into its own part file.
+
+    A line belongs to the shard its first byte falls in, so the shard skips
+    the partial line at its start and finishes the record that crosses its
+    end, reading on past `end` while a quoted field is still open. Unless
+    `aligned` is set, the first whole line is assumed to start a record;
+    clean_with_csv() checks that against the previous shard.
+
+    Returns (processed, skipped, first, last), where `first` and `last` are
+    the byte offsets at which the shard's records start and end.
+    """
+    shard, start, end, aligned = job
+    processed = 0
+    skipped = 0
+
+    # start one byte early so a line beginning exactly at `start` is kept
+    offset = start if aligned or not start else start - 1
+    raw = io.BufferedReader(
+        PrefetchReader(INPUT_FILE, offset, counter=_shard_progress, slot=shard),
+        buffer_size=IO_BUFFER_SIZE,
+    )
+    with raw:
+        pos = start if offset == start else offset + len(raw.readline())
+        first = pos
+        # lines the csv reader had taken when it last completed a record
+        consumed = 0
+
+        def lines():
+            nonlocal pos
+            while pos < end or consumed < reader.line_num:
+                line = raw.readline()
+                if not line:
+                    return
+                pos += len(line)
+                text = line.decode("utf-8", "ignore")
+                if "\0" in text:
+                    # the csv module passes NULs through, but COPY rejects them
+                    text = text.replace("\0", "")
+                if "\r" in text:
+                    # translate \r\n and lone \r as text mode does, so a stray
+                    # \r ends the line instead of reaching csv.reader mid-field
+                    yield from io.StringIO(text, newline=None)
+                else:
+                    yield text
+
+        reader = csv.reader(lines(), delimiter=";")
+        fout, writer = open_new_file(shard + 1)
+        with fout:
+            for processed, row in enumerate(reader, 1):
+                consumed = reader.line_num
+                if len(row) >= row_width:
+                    writer.writerow([field.strip() for field in row[:row_width]])
+                else:
+                    skipped += 1
+
+    return processed, skipped, first, pos
+
+
+def report_progress(progress, ranges, stop):
+    """Print the bytes read across all shards every PROGRESS_INTERVAL seconds"""
+    total = sum(end - start for start, end in ranges)
+    while not stop.wait(PROGRESS_INTERVAL):
+        # read-ahead runs past a shard's end; don't count that twice
+        done = sum(min(read, end - start) for read, (start, end) in zip(progress, ranges))
+        elapsed = time.time() - start_time
+        print(
+            f"Read {done >> 20:,} / {total >> 20:,} MiB "
+            f"({done / total * 100:.2f}%) | {(done >> 20) / elapsed:,.1f} MiB/sec",
+            flush=True
+        )
+
+
+def clean_with_csv():
+    """Clean with the csv module, one worker process per output file"""
+    ranges = shard_ranges(os.path.getsize(INPUT_FILE), NUM_SHARDS)
+    jobs = [(shard, start, end, False) for shard, (start, end) in enumerate(ranges)]
+
+    progress = multiprocessing.RawArray("Q", NUM_SHARDS)
+    stop = threading.Event()
+    reporter = threading.Thread(target=report_progress, args=(progress, ranges, stop), daemon=True)
+    reporter.start()
+
+    processes = min(NUM_SHARDS, os.cpu_count() or 1)
+    with multiprocessing.Pool(
+        processes=processes, initializer=init_shard_worker, initargs=(progress,)
+    ) as pool:
+        results = pool.map(clean_shard, jobs)
+
+    # A quoted field with newlines can run across a shard boundary: the shard
+    # before it then finishes the record past its end, and this shard started
+    # mid-record. Redo such shards from where the previous one really stopped.
+    for shard in range(1, NUM_SHARDS):
+        last = results[shard - 1][3]
+        if results[shard][2] != last:
+            results[shard] = clean_shard((shard, last, ranges[shard][1], True))
+
+    stop.set()
+    processed = sum(result[0] for result in results)
+    skipped = sum(result[1] for result in results)
+    return processed, skipped, NUM_SHARDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Clean {INPUT_FILE} into {OUTPUT_PREFIX}_N.csv files")
+    parser.add_argument('--arrow', action='store_true',
+                        help='Parse with pyarrow instead of the csv module '
+                             '(same rows, but the order within part files may differ)')
+    args = parser.parse_args()
+
+    if args.arrow:
+        if pacsv is None:
+            parser.error("--arrow requires pyarrow")
+        processed, skipped, file_count = clean_with_arrow()
+    else:
+        processed, skipped, file_count = clean_with_csv()
+
+    elapsed = time.time() - start_time
+    print(f"\nDone. {processed:,} rows processed in {elapsed:.1f} seconds.")
+    if skipped:
+        print(f"Skipped {skipped:,} rows with fewer than {row_width} columns.")
+    print(f"Created {file_count} output files.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,16 @@ Import cleaned CSV files (data_clean_part_1.csv through data_clean_part_7.csv)
 into PostgreSQL database. Drops existing database and recreates it.
 """
 
+import argparse
 import csv
+import io
+import multiprocessing
+import threading
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import execute_values
 import os
-import re
+import sys
 from datetime import datetime
 
 # Database configuration
@@ -30,34 +35,142 @@ CSV_FILES = [
     "data_clean_part_7.csv"
 ]
 
-def extract_video_id(url):
-    """Extract video ID from URL"""
-    if not url:
-        return None
-    match = re.search(r'video\.([a-z0-9]+)', url)
-    return match.group(1) if match else None
+# Uncleaned source file for --raw, which skips the part files entirely
+RAW_CSV_FILE = os.path.join(CSV_BASE_PATH, "data.csv")
+RAW_COLUMN_COUNT = 15  # columns kept from each raw row (see read-file.py)
+PROGRESS_INTERVAL = 2  # seconds between --raw progress lines
 
-def construct_iframe(video_id):
-    """Construct iframe HTML from video ID"""
-    if not video_id:
-        return None
-    return f'<iframe src="https://www.xvideos.com/embedframe/{video_id}" frameborder="0" width="510" height="400" scrolling="no" allowfullscreen="allowfullscreen"></iframe>'
+# Indexes from prisma/schema.prisma, built once after the bulk load
+VIDEO_INDEXES = [
+    "CREATE INDEX videos_created_at_idx ON videos (created_at DESC)",
+    "CREATE INDEX videos_title_idx ON videos (title)",
+    "CREATE INDEX videos_category_idx ON videos (category)",
+    "CREATE INDEX videos_tags_idx ON videos (tags)",
+    "CREATE INDEX videos_performers_idx ON videos (performers)",
+    "CREATE INDEX videos_views_idx ON videos (views DESC)",
+    "CREATE INDEX videos_likes_idx ON videos (likes DESC)",
+    "CREATE INDEX videos_category_created_at_idx ON videos (category, created_at DESC)",
+    "CREATE INDEX videos_tags_created_at_idx ON videos (tags, created_at DESC)",
+    "CREATE INDEX videos_performers_created_at_idx ON videos (performers, created_at DESC)",
+    "CREATE INDEX videos_views_created_at_idx ON videos (views DESC, created_at DESC)",
+    "CREATE INDEX videos_views_random_idx ON videos (views)",
+    "CREATE INDEX videos_id_random_idx ON videos (id)",
+]
 
-def parse_duration(duration_str):
-    """Parse duration string like '1305 sec' to integer seconds"""
-    if not duration_str:
-        return None
-    match = re.search(r'(\d+)', duration_str)
-    return int(match.group(1)) if match else None
+# Session settings for connections that run the bulk load. Each file is
+# loaded and committed as one transaction, so these are set once per
+# session rather than with SET LOCAL.
+LOAD_SESSION_SETTINGS = [
+    # Nothing to wait for: videos is UNLOGGED until finalize_tables()
+    "SET synchronous_commit = off",
+    # Keep the video_staging temp table in memory; only takes effect
+    # before the session first touches a temp table
+    "SET temp_buffers = '1GB'",
+    "SET work_mem = '256MB'",
+]
 
-def parse_views(views_str):
-    """Parse views string to integer"""
-    if not views_str:
-        return 0
-    try:
-        return int(views_str.replace(',', '').strip())
-    except:
-        return 0
+# Columns of the cleaned CSV files (see read-file.py), loaded untouched
+STAGING_COLUMNS = (
+    "video_url", "title", "duration", "thumbnail_url", "embed_code",
+    "tags", "actors", "views", "category", "quality", "uploader",
+    "empty_field", "publish_date", "thumbnail_url_2", "status",
+)
+
+# Per-session staging table; being TEMP it is never WAL-logged and the
+# parallel workers can't see each other's rows
+CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE video_staging (
+        {", ".join(f"{column} TEXT" for column in STAGING_COLUMNS)}
+    ) ON COMMIT DROP
+"""
+
+# FORCE_NOT_NULL keeps unquoted empty fields as '' rather than NULL
+COPY_STAGING_SQL = f"""
+    COPY video_staging FROM STDIN
+    WITH (FORMAT CSV, DELIMITER ';', HEADER {{header}},
+          FORCE_NOT_NULL ({", ".join(STAGING_COLUMNS)}))
+"""
+
+# Fallback for servers/proxies that don't support COPY: multi-row INSERTs,
+# one statement per INSERT_PAGE_SIZE rows
+INSERT_STAGING_SQL = f"INSERT INTO video_staging ({', '.join(STAGING_COLUMNS)}) VALUES %s"
+INSERT_PAGE_SIZE = 1000
+
+# All per-row parsing and validation runs server-side in one pass
+TRANSFORM_STAGING_SQL = r"""
+    INSERT INTO videos
+    (title, source_url, thumbnail_url, duration, category, iframe,
+     tags, performers, quality, uploader, publish_date, views)
+    SELECT
+        title,
+        video_url,
+        COALESCE(NULLIF(thumbnail_url_2, ''), thumbnail_url),
+        substring(duration from '^([0-9]{1,9})(?: |$)')::int,
+        category,
+        '<iframe src="https://www.xvideos.com/embedframe/'
+            || substring(video_url from 'video\.([a-z0-9]+)')
+            || '" frameborder="0" width="510" height="400" scrolling="no" allowfullscreen="allowfullscreen"></iframe>',
+        tags,
+        actors,
+        quality,
+        uploader,
+        publish_date,
+        CASE WHEN replace(views, ',', '') ~ '^[0-9]{1,9}$'
+             THEN replace(views, ',', '')::int ELSE 0 END
+    FROM video_staging
+    WHERE title <> ''
+      AND video_url <> ''
+      AND COALESCE(NULLIF(thumbnail_url_2, ''), thumbnail_url) <> ''
+"""
+
+def load_staged(cursor, source, header, use_copy=True):
+    """Load CSV text from `source` into a fresh staging table and move it into videos
+    
+    Rows are staged with COPY, or with execute_values when use_copy is
+    False. Returns (imported, skipped). Must run inside a transaction,
+    since the staging table is dropped on commit.
+    """
+    cursor.execute(CREATE_STAGING_SQL)
+    short_rows = 0
+    if use_copy:
+        cursor.copy_expert(COPY_STAGING_SQL.format(header="true" if header else "false"), source)
+    else:
+        reader = csv.reader(source, delimiter=';')
+        if header:
+            next(reader, None)
+        
+        def staged_rows():
+            nonlocal short_rows
+            for row in reader:
+                if len(row) < len(STAGING_COLUMNS):
+                    short_rows += 1
+                    continue
+                yield row[:len(STAGING_COLUMNS)]
+        
+        execute_values(cursor, INSERT_STAGING_SQL, staged_rows(), page_size=INSERT_PAGE_SIZE)
+    cursor.execute("SELECT COUNT(*) FROM video_staging")
+    staged = cursor.fetchone()[0]
+    cursor.execute(TRANSFORM_STAGING_SQL)
+    return cursor.rowcount, staged - cursor.rowcount + short_rows
+
+def get_db_connection():
+    """Open a connection to the import database"""
+    return psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+
+def configure_load_session(conn):
+    """Apply LOAD_SESSION_SETTINGS to a connection that will run the bulk load"""
+    cursor = conn.cursor()
+    # One round trip for all of them
+    cursor.execute(";\n".join(LOAD_SESSION_SETTINGS))
+    # Commit so the settings outlive this transaction
+    conn.commit()
+    cursor.close()
 
 def drop_and_create_database():
     """Drop existing database and create a fresh one"""
@@ -75,18 +188,10 @@ def drop_and_create_database():
         conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
         cursor = conn.cursor()
         
-        # Terminate all connections to the database
-        print(f"Terminating connections to '{DB_NAME}'...")
-        cursor.execute(f"""
-            SELECT pg_terminate_backend(pg_stat_activity.pid)
-            FROM pg_stat_activity
-            WHERE pg_stat_activity.datname = '{DB_NAME}'
-            AND pid <> pg_backend_pid()
-        """)
-        
-        # Drop database if exists
+        # Drop database if exists; FORCE (PostgreSQL 13+) terminates any
+        # open connections to it in the same statement
         print(f"Dropping database '{DB_NAME}' if it exists...")
-        cursor.execute(f"DROP DATABASE IF EXISTS {DB_NAME}")
+        cursor.execute(f"DROP DATABASE IF EXISTS {DB_NAME} WITH (FORCE)")
         print("✓ Database dropped")
         
         # Create fresh database
@@ -103,27 +208,23 @@ def drop_and_create_database():
         print(f"✗ Error resetting database: {e}")
         return False
 
-def create_tables():
+def create_tables(conn):
     """Create tables matching Prisma schema"""
     print("\n=== CREATING TABLES ===")
     
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
         cursor = conn.cursor()
         
-        # Create videos table matching Prisma schema
+        # All three tables are created in a single round trip.
+        # videos matches the Prisma schema, minus the primary key, NOT NULL
+        # constraints and WAL: those are added by finalize_tables() once the
+        # bulk load is done
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS videos (
-                id TEXT PRIMARY KEY DEFAULT gen_random_uuid()::text,
-                title TEXT NOT NULL,
+            CREATE UNLOGGED TABLE IF NOT EXISTS videos (
+                id TEXT DEFAULT gen_random_uuid()::text,
+                title TEXT,
                 source_url TEXT,
-                thumbnail_url TEXT NOT NULL,
+                thumbnail_url TEXT,
                 duration INTEGER,
                 file_path TEXT,
                 compressed BOOLEAN DEFAULT false,
@@ -140,11 +241,8 @@ def create_tables():
                 stream_id TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create streams table
-        cursor.execute("""
+            );
+            
             CREATE TABLE IF NOT EXISTS streams (
                 id TEXT PRIMARY KEY DEFAULT gen_random_uuid()::text,
                 name TEXT NOT NULL,
@@ -153,11 +251,8 @@ def create_tables():
                 last_pulled TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create user_settings table
-        cursor.execute("""
+            );
+            
             CREATE TABLE IF NOT EXISTS user_settings (
                 id TEXT PRIMARY KEY DEFAULT gen_random_uuid()::text,
                 compression_level TEXT DEFAULT '720p',
@@ -173,147 +268,199 @@ def create_tables():
         
         conn.commit()
         cursor.close()
-        conn.close()
         
         print("✓ Tables created successfully")
         return True
         
     except Exception as e:
+        conn.rollback()
         print(f"✗ Error creating tables: {e}")
         return False
 
-def import_csv_file(file_path, file_num, total_files):
-    """Import a single CSV file into the database"""
+def finalize_tables(conn):
+    """Restore WAL logging, constraints and indexes on videos after the bulk load"""
+    print("\n=== FINALIZING TABLES ===")
+    
+    try:
+        cursor = conn.cursor()
+        
+        # Give the sort-based index builds plenty of memory
+        print("Enabling WAL logging on videos...")
+        cursor.execute("""
+            SET maintenance_work_mem = '2GB';
+            ALTER TABLE videos SET LOGGED
+        """)
+        
+        print("Adding primary key and NOT NULL constraints...")
+        cursor.execute("""
+            ALTER TABLE videos
+                ALTER COLUMN title SET NOT NULL,
+                ALTER COLUMN thumbnail_url SET NOT NULL,
+                ADD PRIMARY KEY (id)
+        """)
+        # Keep the logged table and its key even if an index build fails
+        conn.commit()
+        
+        print(f"Creating {len(VIDEO_INDEXES)} indexes...")
+        cursor.execute(";\n".join(VIDEO_INDEXES))
+        
+        conn.commit()
+        cursor.close()
+        
+        print("✓ Tables finalized")
+        return True
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error finalizing tables: {e}")
+        return False
+
+def import_csv_file(conn, file_path, file_num, total_files, use_copy=True):
+    """Import a single CSV file into the database
+    
+    Returns (imported, skipped), or None if the file failed to load.
+    """
     
     if not os.path.exists(file_path):
         print(f"✗ File not found: {file_path}")
-        return 0, 0
+        return None
     
     print(f"\n[{file_num}/{total_files}] Processing: {os.path.basename(file_path)}")
     
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
         cursor = conn.cursor()
         
-        imported = 0
-        skipped = 0
-        batch_size = 5000
-        batch = []
-        
+        # The part files are already clean CSV: hand them to COPY as-is
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            reader = csv.DictReader(f, delimiter=';')
-            
-            for row_num, row in enumerate(reader, 1):
-                try:
-                    # Extract data from CSV columns
-                    video_url = row.get('video_url', '').strip()
-                    title = row.get('title', '').strip()
-                    duration_str = row.get('duration', '').strip()
-                    thumbnail_url = row.get('thumbnail_url', '').strip()
-                    embed_code = row.get('embed_code', '').strip()
-                    tags = row.get('tags', '').strip()
-                    actors = row.get('actors', '').strip()
-                    views_str = row.get('views', '').strip()
-                    category = row.get('category', '').strip()
-                    quality = row.get('quality', '').strip()
-                    uploader = row.get('uploader', '').strip()
-                    publish_date = row.get('publish_date', '').strip()
-                    thumbnail_url_2 = row.get('thumbnail_url_2', '').strip()
-                    
-                    # Skip rows without essential data
-                    if not title or not video_url:
-                        skipped += 1
-                        continue
-                    
-                    # Extract video ID and construct iframe
-                    video_id = extract_video_id(video_url)
-                    iframe = construct_iframe(video_id)
-                    
-                    # Parse numeric fields
-                    duration = parse_duration(duration_str)
-                    views = parse_views(views_str)
-                    
-                    # Use thumbnail_url_2 if available, otherwise use thumbnail_url
-                    final_thumbnail = thumbnail_url_2 if thumbnail_url_2 else thumbnail_url
-                    
-                    if not final_thumbnail:
-                        skipped += 1
-                        continue
-                    
-                    # Add to batch
-                    batch.append((
-                        title,
-                        video_url,
-                        final_thumbnail,
-                        duration,
-                        category,
-                        iframe,
-                        tags,
-                        actors,
-                        quality,
-                        uploader,
-                        publish_date,
-                        views
-                    ))
-                    
-                    # Execute batch insert
-                    if len(batch) >= batch_size:
-                        cursor.executemany("""
-                            INSERT INTO videos 
-                            (title, source_url, thumbnail_url, duration, category, iframe, 
-                             tags, performers, quality, uploader, publish_date, views)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """, batch)
-                        conn.commit()
-                        imported += len(batch)
-                        print(f"  Progress: {imported:,} imported, {skipped:,} skipped")
-                        batch = []
-                    
-                except Exception as e:
-                    skipped += 1
-                    if row_num < 10:  # Only show first few errors
-                        print(f"  Row {row_num} error: {e}")
-                    continue
-            
-            # Insert remaining batch
-            if batch:
-                cursor.executemany("""
-                    INSERT INTO videos 
-                    (title, source_url, thumbnail_url, duration, category, iframe, 
-                     tags, performers, quality, uploader, publish_date, views)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, batch)
-                conn.commit()
-                imported += len(batch)
+            imported, skipped = load_staged(cursor, f, header=True, use_copy=use_copy)
+        conn.commit()
         
         cursor.close()
-        conn.close()
         
         print(f"✓ Completed: {imported:,} imported, {skipped:,} skipped")
         return imported, skipped
         
     except Exception as e:
+        conn.rollback()
         print(f"✗ Error processing file: {e}")
-        return 0, 0
+        return None
+
+# Connection owned by a Pool worker process, reused for every file it imports
+_worker_conn = None
+
+def connect_worker():
+    """Open and configure this worker process's connection, or None on failure"""
+    global _worker_conn
+    conn = None
+    try:
+        conn = get_db_connection()
+        configure_load_session(conn)
+        _worker_conn = conn
+    except Exception as e:
+        print(f"✗ Worker failed to connect: {e}")
+        if conn is not None:
+            conn.close()
+        _worker_conn = None
+    return _worker_conn
+
+def init_worker():
+    """Pool initializer: open this worker process's connection once.
+
+    Must not raise: a failing initializer makes the Pool respawn workers forever.
+    """
+    connect_worker()
+
+def import_csv_file_worker(job):
+    """Pool entry point: import CSV_FILES[index] on this process's own connection"""
+    index, csv_file, use_copy = job
+    file_path = os.path.join(CSV_BASE_PATH, csv_file)
+    # Retry a connection the initializer could not open
+    if _worker_conn is None and connect_worker() is None:
+        print(f"\n[{index + 1}/{len(CSV_FILES)}] ✗ Error processing file {csv_file}: no database connection")
+        return None
+    return import_csv_file(_worker_conn, file_path, index + 1, len(CSV_FILES), use_copy)
+
+def report_progress(fd, total, stop):
+    """Print how far reading the file behind `fd` has got until `stop` is set"""
+    while not stop.wait(PROGRESS_INTERVAL):
+        position = os.lseek(fd, 0, os.SEEK_CUR)
+        print(f"  Progress: {position >> 20:,} / {total >> 20:,} MiB streamed "
+              f"({position / total * 100:.1f}%)")
+
+def import_raw_file(conn, file_path, use_copy=True):
+    """Clean the raw CSV and pipe it straight into a single staging COPY
+    
+    A producer thread strips rows into an OS pipe while the COPY on the
+    main thread drains it, so no part files hit the disk and only the pipe
+    buffer is held in memory. Returns (imported, skipped), or None on failure.
+    """
+    
+    if not os.path.exists(file_path):
+        print(f"✗ File not found: {file_path}")
+        return None
+    
+    print(f"\nStreaming: {os.path.basename(file_path)}")
+    
+    counts = {"short": 0}
+    errors = []
+    
+    def produce(f):
+        try:
+            with io.TextIOWrapper(os.fdopen(write_fd, 'wb', buffering=1 << 20),
+                                  encoding='utf-8', newline='') as pipe:
+                writer = csv.writer(pipe, delimiter=';', lineterminator='\n')
+                # COPY rejects NULs, which the csv module passes through
+                lines = (line.replace('\0', '') for line in f)
+                for row in csv.reader(lines, delimiter=';'):
+                    if len(row) < RAW_COLUMN_COUNT:
+                        counts["short"] += 1
+                    else:
+                        writer.writerow([field.strip() for field in row[:RAW_COLUMN_COUNT]])
+        except Exception as e:
+            # The pipe is closed either way, which ends the COPY
+            errors.append(e)
+    
+    try:
+        cursor = conn.cursor()
+        
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            read_fd, write_fd = os.pipe()
+            producer = threading.Thread(target=produce, args=(f,), daemon=True)
+            stop = threading.Event()
+            reporter = threading.Thread(
+                target=report_progress, args=(f.fileno(), os.path.getsize(file_path), stop), daemon=True
+            )
+            producer.start()
+            reporter.start()
+            try:
+                with os.fdopen(read_fd, 'r', encoding='utf-8', newline='') as pipe:
+                    imported, skipped = load_staged(cursor, pipe, header=False, use_copy=use_copy)
+            finally:
+                producer.join()
+                stop.set()
+                reporter.join()
+        
+        # A truncated stream must not be committed
+        if errors:
+            raise errors[0]
+        
+        conn.commit()
+        cursor.close()
+        
+        skipped += counts["short"]
+        print(f"✓ Completed: {imported:,} imported, {skipped:,} skipped")
+        return imported, skipped
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error streaming file: {e}")
+        return None
 
-def show_summary():
+def show_summary(conn):
     """Show import summary and sample data"""
     print("\n=== IMPORT SUMMARY ===")
     
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
         cursor = conn.cursor()
         
         # Total count
@@ -354,27 +501,50 @@ def show_summary():
                 print(f"     Category: {cat}, Duration: {dur}s, Views: {views:,}")
         
         cursor.close()
-        conn.close()
         
     except Exception as e:
+        conn.rollback()
         print(f"Error showing summary: {e}")
 
 def main():
     """Main import process"""
+    parser = argparse.ArgumentParser(description="Import video CSV data into PostgreSQL")
+    parser.add_argument(
+        "--raw", nargs="?", const=RAW_CSV_FILE, metavar="PATH",
+        help=f"stream the uncleaned CSV (default {RAW_CSV_FILE}) straight into "
+             "the database instead of importing the cleaned part files"
+    )
+    parser.add_argument(
+        "--no-copy", dest="copy", action="store_false",
+        help="stage rows with multi-row INSERTs instead of COPY, for servers "
+             "or poolers where COPY is unavailable"
+    )
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("CSV DATA IMPORT SCRIPT")
     print("=" * 60)
     print(f"Database: {DB_NAME}")
     print(f"CSV Location: {CSV_BASE_PATH}")
-    print(f"Files to import: {len(CSV_FILES)}")
+    if args.raw:
+        print(f"Raw file to stream: {args.raw}")
+    else:
+        print(f"Files to import: {len(CSV_FILES)}")
     
     # Step 1: Drop and recreate database
     if not drop_and_create_database():
         print("\n✗ Failed to reset database. Aborting.")
         return
     
+    # One connection for the rest of the run (workers open their own)
+    try:
+        conn = get_db_connection()
+    except Exception as e:
+        print(f"\n✗ Failed to connect to '{DB_NAME}': {e}")
+        return
+    
     # Step 2: Create tables
-    if not create_tables():
+    if not create_tables(conn):
         print("\n✗ Failed to create tables. Aborting.")
         return
     
@@ -383,20 +553,48 @@ def main():
     total_imported = 0
     total_skipped = 0
     
-    for i, csv_file in enumerate(CSV_FILES, 1):
-        file_path = os.path.join(CSV_BASE_PATH, csv_file)
-        imported, skipped = import_csv_file(file_path, i, len(CSV_FILES))
-        total_imported += imported
-        total_skipped += skipped
+    if args.raw:
+        configure_load_session(conn)
+        sources = [args.raw]
+        results = [import_raw_file(conn, args.raw, args.copy)]
+    else:
+        sources = CSV_FILES
+        # One worker process per file; each runs its own COPY stream into videos.
+        # COPY FROM only takes a RowExclusiveLock, so the workers don't block each other.
+        processes = min(len(CSV_FILES), os.cpu_count() or 1)
+        with multiprocessing.Pool(processes=processes, initializer=init_worker) as pool:
+            jobs = [(index, csv_file, args.copy) for index, csv_file in enumerate(CSV_FILES)]
+            results = pool.map(import_csv_file_worker, jobs)
+    
+    failed_files = [source for source, result in zip(sources, results) if result is None]
+    for result in results:
+        if result is not None:
+            total_imported += result[0]
+            total_skipped += result[1]
     
-    # Step 4: Show summary
+    # Step 4: Add constraints and indexes now that the data is loaded
+    if not finalize_tables(conn):
+        print("\n✗ Failed to finalize tables. Aborting.")
+        conn.close()
+        sys.exit(1)
+    
+    # Step 5: Report totals
     print("\n" + "=" * 60)
-    print(f"✓ IMPORT COMPLETE")
+    if failed_files:
+        print(f"✗ IMPORT FAILED FOR {len(failed_files)} OF {len(sources)} FILES")
+        for source in failed_files:
+            print(f"  {os.path.basename(source)}")
+    else:
+        print(f"✓ IMPORT COMPLETE")
     print(f"Total imported: {total_imported:,}")
     print(f"Total skipped: {total_skipped:,}")
     print("=" * 60)
     
-    show_summary()
+    show_summary(conn)
+    conn.close()
+    
+    if failed_files:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
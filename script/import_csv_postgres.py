@@ -2,36 +2,76 @@
 """
 CSV to PostgreSQL Import Script
 Handles large CSV files with pipe-separated values
+
+The per-row helpers are type-annotated so the module can be compiled with
+mypyc (run `mypyc import_csv_postgres.py` in this directory). Running this
+file as a script always uses the source; to use the compiled extension, run
+`python -c "import import_csv_postgres; import_csv_postgres.main()"` here.
 """
 
 import csv
-import psycopg2
+import io
+import psycopg2  # type: ignore[import-untyped]
 import os
 import sys
 from datetime import datetime
 import re
+from typing import Any, List, Optional, Tuple
+
+# (title, source_url, thumbnail_url, duration, iframe, tags, performers, category)
+VideoRow = Tuple[str, str, str, Optional[int], str, str, str, str]
+
+BATCH_SIZE = 5000
+COPY_NULL = "\\N"
+
+COPY_VIDEOS_SQL = r"""
+    COPY videos
+    (title, source_url, thumbnail_url, duration, iframe, tags, performers, category)
+    FROM STDIN WITH (FORMAT CSV, DELIMITER E'\x1f', NULL '\N')
+"""
+
+IFRAME_PREFIX = '<iframe src="https://www.xvideos.com/embedframe/'
+IFRAME_SUFFIX = '" frameborder="0" width="510" height="400" scrolling="no" allowfullscreen="allowfullscreen"></iframe>'
+
+VIDEO_ID_RE = re.compile(r'video\.([a-z0-9]+)')
 
-def extract_video_id(url):
+def extract_video_id(url: str) -> Optional[str]:
     """Extract video ID from URL"""
-    match = re.search(r'video\.([a-z0-9]+)', url)
+    match = VIDEO_ID_RE.search(url)
     return match.group(1) if match else None
 
-def construct_iframe(video_id):
+def construct_iframe(video_id: str) -> str:
     """Construct iframe HTML"""
-    return f'<iframe src="https://www.xvideos.com/embedframe/{video_id}" frameborder="0" width="510" height="400" scrolling="no" allowfullscreen="allowfullscreen"></iframe>'
+    return IFRAME_PREFIX + video_id + IFRAME_SUFFIX
 
-def parse_duration(duration_str):
+def parse_duration(duration_str: str) -> Optional[int]:
     """Parse duration string like '1305 sec' to integer"""
     if not duration_str:
         return None
-    match = re.search(r'(\d+)', duration_str)
-    return int(match.group(1)) if match else None
+    seconds = duration_str.split(' ', 1)[0]
+    return int(seconds) if seconds.isdecimal() else None
 
-def parse_views(views_str):
-    """Parse views string to integer"""
-    if not views_str:
-        return 0
-    return int(views_str.replace(',', ''))
+def copy_rows(cursor: Any, sql: str, rows: List[VideoRow]) -> None:
+    """Stream row tuples into a table with COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter='\x1f', lineterminator='\n')
+    for row in rows:
+        writer.writerow([COPY_NULL if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(sql, buffer)
+
+def flush_batch(conn: Any, cursor: Any, batch: List[VideoRow]) -> bool:
+    """COPY pending videos rows, then commit; on failure roll the batch back"""
+    try:
+        copy_rows(cursor, COPY_VIDEOS_SQL, batch)
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"Error loading batch of {len(batch)} rows: {e}")
+        return False
+    finally:
+        batch.clear()
 
 def get_db_connection():
     """Create database connection"""
@@ -49,29 +89,9 @@ def get_db_connection():
         return None
 
 def create_table_if_not_exists(conn):
-    """Create temporary table for import"""
+    """Create the videos table for import"""
     cursor = conn.cursor()
     
-    # Create a staging table that matches CSV structure
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS video_staging (
-            url TEXT,
-            title TEXT,
-            duration TEXT,
-            thumbnail_url TEXT,
-            iframe TEXT,
-            tags TEXT,
-            actors TEXT,
-            views TEXT,
-            quality TEXT,
-            category TEXT,
-            empty TEXT,
-            publish_date TEXT,
-            thumbnail_url2 TEXT,
-            unknown TEXT
-        )
-    """)
-    
     # Create final table if it doesn't exist (matching your Prisma schema)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS videos (
@@ -97,7 +117,7 @@ def create_table_if_not_exists(conn):
     conn.commit()
     cursor.close()
 
-def import_csv_file(conn, csv_file_path):
+def import_csv_file(conn: Any, csv_file_path: str) -> Tuple[int, int]:
     """Import a single CSV file"""
     if not os.path.exists(csv_file_path):
         print(f"File not found: {csv_file_path}")
@@ -106,6 +126,7 @@ def import_csv_file(conn, csv_file_path):
     cursor = conn.cursor()
     imported = 0
     skipped = 0
+    batch: List[VideoRow] = []
     
     print(f"\nProcessing: {os.path.basename(csv_file_path)}")
     
@@ -123,17 +144,19 @@ def import_csv_file(conn, csv_file_path):
                         skipped += 1
                         continue
                     
+                    # COPY rejects NUL bytes and would fail the whole batch
+                    if any('\x00' in field for field in row):
+                        skipped += 1
+                        continue
+                    
                     url = row[0].strip()
                     title = row[1].strip()
                     duration_str = row[2].strip()
                     thumbnail_url = row[3].strip()
-                    iframe_raw = row[4].strip()
                     tags = row[5].strip()
                     actors = row[6].strip()
-                    views_str = row[7].strip()
                     quality = row[8].strip()
                     category = row[9].strip()
-                    publish_date = row[11].strip()
                     thumbnail_url2 = row[12].strip()
                     
                     # Skip rows without essential data
@@ -149,35 +172,34 @@ def import_csv_file(conn, csv_file_path):
                     
                     iframe = construct_iframe(video_id)
                     duration = parse_duration(duration_str)
-                    views = parse_views(views_str)
                     
                     # Use thumbnail_url2 as primary if available
                     final_thumbnail = thumbnail_url2 if thumbnail_url2 else thumbnail_url
                     
-                    # Insert into staging table first
-                    cursor.execute("""
-                        INSERT INTO video_staging 
-                        (url, title, duration, thumbnail_url, iframe, tags, actors, views, quality, category, empty, publish_date, thumbnail_url2, unknown)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (url, title, duration_str, thumbnail_url, iframe_raw, tags, actors, views_str, quality, category, '', publish_date, thumbnail_url2, ''))
-                    
-                    # Insert into final videos table
-                    cursor.execute("""
-                        INSERT INTO videos 
-                        (title, source_url, thumbnail_url, duration, iframe, tags, performers, category)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (title, url, final_thumbnail, duration, iframe, tags, actors, category or quality))
-                    
-                    imported += 1
-                    
-                    if imported % 1000 == 0:
-                        print(f"  Progress: {imported} imported, {skipped} skipped")
-                        conn.commit()
+                    # Queue for the videos table
+                    batch.append((title, url, final_thumbnail, duration, iframe, tags, actors, category or quality))
                         
                 except Exception as e:
                     print(f"Error on row {row_num}: {e}")
                     skipped += 1
                     continue
+                
+                if len(batch) >= BATCH_SIZE:
+                    # Rows only count as imported once their batch is committed
+                    count = len(batch)
+                    if flush_batch(conn, cursor, batch):
+                        imported += count
+                    else:
+                        skipped += count
+                    print(f"  Progress: {imported} imported, {skipped} skipped")
+            
+            # Flush remaining rows
+            if batch:
+                count = len(batch)
+                if flush_batch(conn, cursor, batch):
+                    imported += count
+                else:
+                    skipped += count
                     
     except Exception as e:
         print(f"Error reading file: {e}")
@@ -248,4 +270,4 @@ def main():
     print("\n✓ Database connection closed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()